@@ -15,10 +15,19 @@ Formulas (based on calc_fabric.ipynb):
 
 CLI usage example:
     python manual_cu_estimator.py --avg-input-tokens 80 --users-per-day 1500 --questions-per-user 5
+
+For parameter sweeps, `compute_capacity_batch` accepts NumPy array-likes
+(optional numpy dependency) and evaluates the whole grid at once.
 """
 from __future__ import annotations
 import argparse
 from dataclasses import dataclass
+from typing import Dict, Any
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover - only needed for compute_capacity_batch
+    np = None
 
 # AIC - Fator de saída dinâmico: quanto menor o avg_input_tokens, maior o fator.
 # AIC - Inputs curtos geram respostas proporcionalmente mais longas.
@@ -66,6 +75,20 @@ def get_output_factor(avg_input_tokens: float) -> float:
         return 0.25
     return 0.25
 
+# Upper bounds (inclusive) and factors of get_output_factor, used by the
+# vectorized path. Keep in sync with the ranges above.
+_OUTPUT_FACTOR_BOUNDS = (10, 30, 50, 70, 100, 150, 200, 400, 700, 1000, 1500, 2000)
+_OUTPUT_FACTORS = (20, 15, 10, 8, 5, 4, 2, 1.0, 0.7, 0.5, 0.35, 0.25, 0.25)
+
+# CU cost in milliseconds per input / output token. The batch path folds
+# (input*100 + input*factor*400) into one CU-hours-per-input-token rate per
+# range, so each scenario costs a single multiply.
+_CU_MS_PER_INPUT_TOKEN = 100
+_CU_MS_PER_OUTPUT_TOKEN = 400
+_CU_HOURS_PER_INPUT_TOKEN = tuple(
+    (_CU_MS_PER_INPUT_TOKEN + f * _CU_MS_PER_OUTPUT_TOKEN) / 3_600_000 for f in _OUTPUT_FACTORS
+)
+
 @dataclass
 class CapacityResult:
     input_tokens: float
@@ -121,6 +144,53 @@ def compute_capacity(avg_input_tokens: float, users_per_day: float, questions_pe
     )
 
 
+def compute_capacity_batch(avg_input_tokens, users_per_day, questions_per_user) -> Dict[str, Any]:
+    """Vectorized compute_capacity for what-if sweeps (requires numpy).
+
+    Arguments are scalars or array-likes and broadcast against each other,
+    e.g. ``compute_capacity_batch([[50], [80]], [1000, 1500], 5)`` evaluates
+    a 2x2 grid. Returns a dict of arrays keyed like CapacityResult fields,
+    all broadcast to the same shape; when every argument is a scalar the
+    values are plain floats. Non-finite or non-positive inputs are rejected.
+    """
+    if np is None:
+        raise ImportError("numpy not installed. Run: pip install numpy")
+    tokens = np.asarray(avg_input_tokens, dtype=float)
+    users = np.asarray(users_per_day, dtype=float)
+    questions = np.asarray(questions_per_user, dtype=float)
+    if np.any(~np.isfinite(tokens) | (tokens <= 0)):
+        raise ValueError("Average input tokens must be finite and > 0")
+    if np.any(~np.isfinite(users) | (users <= 0)):
+        raise ValueError("Users per day must be finite and > 0")
+    if np.any(~np.isfinite(questions) | (questions <= 0)):
+        raise ValueError("Questions per user must be finite and > 0")
+
+    # AIC - Mesmo fator dinâmico de get_output_factor, aplicado por faixa
+    band = np.searchsorted(_OUTPUT_FACTOR_BOUNDS, tokens, side='left')
+    output_tokens = tokens * np.asarray(_OUTPUT_FACTORS)[band]
+    cu_hours = tokens * np.asarray(_CU_HOURS_PER_INPUT_TOKEN)[band]
+    cu_seconds = cu_hours * 3600
+    cu_minutes = cu_hours * 60
+    requests_day = users * questions
+    capacity_need = (requests_day * cu_hours) / 24
+    fields = {
+        "input_tokens": tokens,
+        "output_tokens": output_tokens,
+        "cu_seconds": cu_seconds,
+        "cu_minutes": cu_minutes,
+        "cu_hours": cu_hours,
+        "users_per_day": users,
+        "questions_per_user": questions,
+        "requests_day": requests_day,
+        "capacity_need": capacity_need,
+    }
+    # Give every field the full grid shape so entries line up cell by cell.
+    result = {k: v.copy() for k, v in zip(fields, np.broadcast_arrays(*fields.values()))}
+    if capacity_need.ndim == 0:
+        return {k: v.item() for k, v in result.items()}
+    return result
+
+
 def format_table(rows):
     width = max(len(label) for label, _ in rows) + 2
     lines = []
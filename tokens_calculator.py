@@ -15,20 +15,27 @@ CLI examples:
   python tokens_calculator.py
   python tokens_calculator.py --model gpt-4o-mini
   python tokens_calculator.py --json --text "Line A\nLine B"
+  python tokens_calculator.py --json --totals-only < questions.txt
+  python tokens_calculator.py --prewarm
   python tokens_calculator.py --json --capacity --users-per-day 1500 --questions-per-user 5 --text "What is sales by region?"
 """
 from __future__ import annotations
 import argparse
 import json
+import os
 import sys
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
 
 # ---------------------------------------------------------------------------
 # Embedded analysis logic (merged from former input_estimator.py)
 # ---------------------------------------------------------------------------
 DEFAULT_MODEL = "gpt-4o-mini"
 _FALLBACK_ENCODING = "cl100k_base"
+_TOKEN_COUNT_CACHE_SIZE = 4096
+_BATCH_ENCODE_MIN_LINES = 256
 
 try:
     import tiktoken  # type: ignore
@@ -36,6 +43,7 @@ except ImportError as e:  # pragma: no cover
     raise ImportError("tiktoken not installed. Run: pip install tiktoken") from e
 
 
+@lru_cache(maxsize=8)
 def _get_encoding(model: str):
     try:
         return tiktoken.encoding_for_model(model)
@@ -43,6 +51,125 @@ def _get_encoding(model: str):
         return tiktoken.get_encoding(_FALLBACK_ENCODING)
 
 
+def clear_encoding_cache() -> None:
+    """Release loaded tiktoken encodings (tens of MB of BPE ranks each).
+
+    Long-running callers that analyze many models can call this between
+    models to bound memory. tiktoken keeps every encoding in its own
+    process-wide registry, so that registry is emptied too (under its
+    lock); other tiktoken users in the process simply reload on next use.
+    This relies on tiktoken's private ``registry.ENCODINGS`` / ``_lock``;
+    if they are missing, only this module's lookup cache is cleared.
+    """
+    _get_encoding.cache_clear()
+    registry = getattr(tiktoken, "registry", None)
+    encodings = getattr(registry, "ENCODINGS", None)
+    lock = getattr(registry, "_lock", None)
+    if isinstance(encodings, dict) and lock is not None:
+        with lock:
+            encodings.clear()
+
+
+def _use_persistent_tiktoken_cache() -> Optional[str]:
+    """Point tiktoken at ~/.cache/tiktoken unless the user chose a cache dir.
+
+    tiktoken otherwise caches BPE files under the system temp dir, which is
+    often wiped, forcing a new download. Called from the CLI entry points
+    only, so importing this module leaves the environment untouched.
+    Returns the cache dir tiktoken will use, or None when the user disabled
+    caching by setting the variable to an empty string.
+    """
+    for var in ("TIKTOKEN_CACHE_DIR", "DATA_GYM_CACHE_DIR"):
+        if var in os.environ:
+            return os.environ[var] or None
+    cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "tiktoken")
+    os.environ["TIKTOKEN_CACHE_DIR"] = cache_dir
+    return cache_dir
+
+
+def prewarm_encodings() -> List[str]:
+    """Download/load every known encoding into the tiktoken cache dir.
+
+    Meant for install / image-build time so later runs are cache hits only.
+    Returns the encoding names that were loaded. Raises RuntimeError when
+    tiktoken caching is disabled, since nothing would be written.
+    """
+    if _use_persistent_tiktoken_cache() is None:
+        raise RuntimeError("tiktoken caching is disabled (empty TIKTOKEN_CACHE_DIR / DATA_GYM_CACHE_DIR); nothing to prewarm.")
+    names = sorted(set(tiktoken.model.MODEL_TO_ENCODING.values()) | {_FALLBACK_ENCODING})
+    for name in names:
+        tiktoken.get_encoding(name)
+    return names
+
+
+# (model, line) -> token count, most recently used last. Guarded by the lock;
+# encoding itself happens outside it.
+_token_count_cache: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+_token_count_lock = threading.Lock()
+
+
+def _count_tokens(lines: List[str], model: str) -> List[int]:
+    """Token count per line, reusing counts of lines seen before (bounded LRU).
+
+    Only unseen lines are encoded. Safe to call from several threads.
+    """
+    cache = _token_count_cache
+    unique = list(dict.fromkeys(lines))
+    counts: Dict[str, int] = {}
+    with _token_count_lock:
+        for line in unique:
+            key = (model, line)
+            if key in cache:
+                cache.move_to_end(key)
+                counts[line] = cache[key]
+    misses = [line for line in unique if line not in counts]
+    if misses:
+        # encode_ordinary_batch fans lines out over a fresh thread pool per call,
+        # which only pays off for large inputs. Only the counts are kept; the
+        # token id lists are released right away.
+        encoding = _get_encoding(model)
+        if len(misses) >= _BATCH_ENCODE_MIN_LINES:
+            encoded = encoding.encode_ordinary_batch(misses)
+        else:
+            encoded = map(encoding.encode_ordinary, misses)
+        counts.update((line, len(ids)) for line, ids in zip(misses, encoded))
+        # Inserting more misses than the cache holds would only evict them again.
+        with _token_count_lock:
+            for line in misses[-_TOKEN_COUNT_CACHE_SIZE:]:
+                key = (model, line)
+                cache[key] = counts[line]
+                cache.move_to_end(key)
+            while len(cache) > _TOKEN_COUNT_CACHE_SIZE:
+                cache.popitem(last=False)
+    return [counts[line] for line in lines]
+
+
+def _count_lines(text: str, model: str) -> Tuple[List[str], List[int], List[int]]:
+    """Return (lines, word_counts, token_counts) as parallel lists.
+
+    Empty / whitespace-only lines are ignored.
+    """
+    lines_raw = [s for l in text.splitlines() if (s := l.strip())]
+    word_counts = [len(line.split()) for line in lines_raw]
+    token_counts = _count_tokens(lines_raw, model)
+    return lines_raw, word_counts, token_counts
+
+
+def _aggregate_metrics(word_counts: List[int], token_counts: List[int]) -> Dict[str, Any]:
+    # Builtin sum() reduces the count lists in C; converting them to NumPy
+    # arrays first would cost as much as the reduction itself.
+    total_words = sum(word_counts)
+    total_tokens = sum(token_counts)
+    count = len(token_counts) or 1
+    return {
+        "total_words": total_words,
+        "total_tokens": total_tokens,
+        "avg_words_per_line": total_words / count,
+        "avg_tokens_per_line": total_tokens / count,
+        "tokens_per_word": (total_tokens / total_words) if total_words else 0.0,
+    }
+
+
 def analyze_multiline(text: str, model: str = DEFAULT_MODEL) -> Dict[str, Any]:
     """Analyze multi-line text returning per-line & aggregate metrics.
 
@@ -54,39 +181,16 @@ def analyze_multiline(text: str, model: str = DEFAULT_MODEL) -> Dict[str, Any]:
     }
     Empty / whitespace-only lines are ignored.
     """
-    lines_raw = [l.strip() for l in text.splitlines() if l.strip()]
-    encoding = _get_encoding(model)
-
-    per_line: List[Dict[str, Any]] = []
-    total_words = 0
-    total_tokens = 0
-
-    for i, line in enumerate(lines_raw, start=1):
-        words = len(line.split())
-        tokens = len(encoding.encode(line))
-        total_words += words
-        total_tokens += tokens
-        per_line.append({
-            "index": i,
-            "text": line,
-            "words": words,
-            "tokens": tokens,
-        })
-
-    count = len(per_line) or 1
-    avg_words = total_words / count
-    avg_tokens = total_tokens / count
-    tokens_per_word = (total_tokens / total_words) if total_words else 0.0
-
+    lines_raw, word_counts, token_counts = _count_lines(text, model)
+    per_line: List[Dict[str, Any]] = [
+        {"index": i, "text": line, "words": words, "tokens": tokens}
+        for i, (line, words, tokens) in enumerate(zip(lines_raw, word_counts, token_counts), start=1)
+    ]
     return {
         "model": model,
         "lines_count": len(per_line),
         "lines": per_line,
-        "total_words": total_words,
-        "total_tokens": total_tokens,
-        "avg_words_per_line": avg_words,
-        "avg_tokens_per_line": avg_tokens,
-        "tokens_per_word": tokens_per_word,
+        **_aggregate_metrics(word_counts, token_counts),
     }
 
 # AIC - Fator de saída dinâmico: quanto menor o avg_input_tokens, maior o fator.
@@ -135,15 +239,14 @@ def get_output_factor(avg_input_tokens: float) -> float:
         return 0.25
     return 0.25
 
-@dataclass
-class LineResult:
+# NamedTuples: one instance per input line, so keep them light (no __dict__).
+class LineResult(NamedTuple):
     index: int
     text: str
     words: int
     tokens: int
 
-@dataclass
-class Aggregate:
+class Aggregate(NamedTuple):
     total_words: int
     total_tokens: int
     avg_words_per_line: float
@@ -151,7 +254,27 @@ class Aggregate:
     tokens_per_word: float
 
 
-def read_multiline(prompt: str = "Paste questions (one per line). Finish with blank line:\n") -> str:
+_READ_PROMPT = "Paste questions (one per line). Finish with blank line:\n"
+
+
+def _split_piped_input(data: str) -> Tuple[str, List[str]]:
+    """Split piped stdin into the question block and the lines after it.
+
+    Same rules as the interactive loop: leading blank lines are skipped and
+    the first blank line after content ends the questions.
+    """
+    rows = data.splitlines()
+    start = 0
+    while start < len(rows) and not rows[start].strip():
+        start += 1
+    end = start
+    while end < len(rows) and rows[end].strip():
+        end += 1
+    return '\n'.join(rows[start:end]), rows[end + 1:]
+
+
+def _input_questions(prompt: str) -> str:
+    """Read questions line by line with input() until a blank line after content."""
     print(prompt, end='')
     lines: List[str] = []
     while True:
@@ -167,31 +290,59 @@ def read_multiline(prompt: str = "Paste questions (one per line). Finish with bl
     return '\n'.join(lines)
 
 
+def _read_questions(prompt: str = _READ_PROMPT) -> Tuple[str, List[str]]:
+    """Return (questions, remaining piped lines); the latter is empty on a TTY."""
+    if sys.stdin.isatty():
+        return _input_questions(prompt), []
+    # Piped / redirected input: read it in one go instead of line-by-line input().
+    print(prompt, end='')
+    return _split_piped_input(sys.stdin.read())
+
+
+def read_multiline(prompt: str = _READ_PROMPT) -> str:
+    # Line by line on purpose: anything after the blank line stays in stdin
+    # for the caller's next input(). interactive() uses _read_questions.
+    return _input_questions(prompt)
+
+
 def analyze_block(text: str, model: str) -> Dict[str, Any]:
-    data = analyze_multiline(text, model=model)
-    lines = [LineResult(l['index'], l['text'], l['words'], l['tokens']) for l in data['lines']]
-    agg = Aggregate(
-        total_words=data['total_words'],
-        total_tokens=data['total_tokens'],
-        avg_words_per_line=data['avg_words_per_line'],
-        avg_tokens_per_line=data['avg_tokens_per_line'],
-        tokens_per_word=data['tokens_per_word'],
-    )
-    return {"lines": lines, "aggregate": agg, "model": data['model']}
+    # Build LineResult straight from the parallel count lists, skipping the
+    # intermediate per-line dicts of analyze_multiline.
+    lines_raw, word_counts, token_counts = _count_lines(text, model)
+    lines = [
+        LineResult(i, line, words, tokens)
+        for i, (line, words, tokens) in enumerate(zip(lines_raw, word_counts, token_counts), start=1)
+    ]
+    agg = Aggregate(**_aggregate_metrics(word_counts, token_counts))
+    return {"lines": lines, "aggregate": agg, "model": model}
+
+
+def analyze_totals(text: str, model: str = DEFAULT_MODEL) -> Dict[str, Any]:
+    """Same structure as analyze_multiline minus the per-line `lines` array."""
+    _, word_counts, token_counts = _count_lines(text, model)
+    return {
+        "model": model,
+        "lines_count": len(token_counts),
+        **_aggregate_metrics(word_counts, token_counts),
+    }
 
 
 def format_lines(lines: List[LineResult]) -> str:
     if not lines:
         return "(No lines)"
-    w_idx = max(len(str(l.index)) for l in lines)
-    w_words = max(len(str(l.words)) for l in lines)
-    w_tokens = max(len(str(l.tokens)) for l in lines)
+    # One pass: stringify each cell once and track column widths as we go.
+    w_idx = w_words = w_tokens = 0
+    rows = []
+    for l in lines:
+        si, sw, st = str(l.index), str(l.words), str(l.tokens)
+        w_idx = max(w_idx, len(si))
+        w_words = max(w_words, len(sw))
+        w_tokens = max(w_tokens, len(st))
+        rows.append((si, sw, st, l.text))
     header = f"# .{' '*(w_idx-1)}  WORDS{' '*(max(0,w_words-5))}  TOKENS{' '*(max(0,w_tokens-6))}  TEXT"
     sep = '-' * len(header)
-    body = []
-    for l in lines:
-        body.append(f"{str(l.index).rjust(w_idx)}  {str(l.words).rjust(w_words)}  {str(l.tokens).rjust(w_tokens)}  {l.text}")
-    return '\n'.join([header, sep, *body])
+    body = '\n'.join(f"{si:>{w_idx}}  {sw:>{w_words}}  {st:>{w_tokens}}  {t}" for si, sw, st, t in rows)
+    return f"{header}\n{sep}\n{body}"
 
 
 def format_aggregate(agg: Aggregate) -> str:
@@ -227,7 +378,15 @@ def capacity_calc(avg_input_tokens: float, users_per_day: float, questions_per_u
 def interactive(model: str):
     print("=== Tokens & Capacity Calculator ===")
     print(f"Model: {model}")
-    text = read_multiline()
+    text, piped_answers = _read_questions()
+
+    def ask(prompt: str) -> str:
+        # Piped sessions answer the prompts with the lines after the questions.
+        if piped_answers:
+            print(prompt, end='')
+            return piped_answers.pop(0)
+        return input(prompt)
+
     if not text.strip():
         print("No text provided. Exiting.")
         return
@@ -239,23 +398,32 @@ def interactive(model: str):
     lines: List[LineResult] = data['lines']
     agg: Aggregate = data['aggregate']
 
-    print("\n--- Per-line Metrics ---")
-    print(format_lines(lines))
-    print("\n--- Aggregates ---")
-    print(format_aggregate(agg))
+    # One write for the whole report (the per-line table can be thousands of rows).
+    sys.stdout.write(
+        f"\n--- Per-line Metrics ---\n{format_lines(lines)}\n"
+        f"\n--- Aggregates ---\n{format_aggregate(agg)}\n"
+    )
+    sys.stdout.flush()
 
-    if input("\nCompute capacity estimate? (y/N): ").strip().lower() == 'y':
+    try:
+        want_capacity = ask("\nCompute capacity estimate? (y/N): ").strip().lower() == 'y'
+    except EOFError:  # piped input ended before the capacity answers
+        want_capacity = False
+    if want_capacity:
         try:
-            users = float(input("Users per day: ").strip())
-            q_per_user = float(input("Questions per user per day: ").strip())
+            users = float(ask("Users per day: ").strip())
+            q_per_user = float(ask("Questions per user per day: ").strip())
             cap = capacity_calc(agg.avg_tokens_per_line, users, q_per_user)
-            print("\n--- Capacity Estimate ---")
-            print(f"Avg input tokens / request : {cap['avg_input_tokens']:.2f}")
-            print(f"Output tokens (est)        : {cap['output_tokens_est']:.2f}")
-            print(f"CU Seconds / request       : {cap['cu_seconds_per_request']:.4f}")
-            print(f"CU Hours / request         : {cap['cu_hours_per_request']:.8f}")
-            print(f"Requests / day             : {cap['requests_day']:.0f}")
-            print(f"Capacity Need (CU)         : {cap['capacity_need']:.6f}")
+            sys.stdout.write(
+                "\n--- Capacity Estimate ---\n"
+                f"Avg input tokens / request : {cap['avg_input_tokens']:.2f}\n"
+                f"Output tokens (est)        : {cap['output_tokens_est']:.2f}\n"
+                f"CU Seconds / request       : {cap['cu_seconds_per_request']:.4f}\n"
+                f"CU Hours / request         : {cap['cu_hours_per_request']:.8f}\n"
+                f"Requests / day             : {cap['requests_day']:.0f}\n"
+                f"Capacity Need (CU)         : {cap['capacity_need']:.6f}\n"
+            )
+            sys.stdout.flush()
         except ValueError:
             print("Invalid numeric input. Skipping capacity section.")
 
@@ -268,11 +436,21 @@ def parse_args():
     p.add_argument('--capacity', action='store_true', help='Include capacity block in JSON output.')
     p.add_argument('--users-per-day', type=float, help='Users per day (JSON capacity).')
     p.add_argument('--questions-per-user', type=float, help='Questions per user per day (JSON capacity).')
+    p.add_argument('--totals-only', action='store_true', help='JSON mode: emit totals (and capacity) without the per-line array.')
+    p.add_argument('--prewarm', action='store_true', help='Populate the tiktoken cache (default ~/.cache/tiktoken) and exit.')
     return p.parse_args()
 
 
 def main():
     args = parse_args()
+    cache_dir = _use_persistent_tiktoken_cache()
+    if args.prewarm:
+        try:
+            names = prewarm_encodings()
+        except RuntimeError as e:
+            sys.exit(f"Error: {e}")
+        print(f"Cached encodings in {cache_dir}: {', '.join(names)}")
+        return
     if not args.json:
         interactive(args.model)
         return
@@ -283,32 +461,33 @@ def main():
         print(json.dumps({"error": "No text provided"}))
         return
     try:
-        data = analyze_block(text, args.model)
+        # Plain dicts straight from the analysis; LineResult is only for the text table.
+        data = analyze_totals(text, args.model) if args.totals_only else analyze_multiline(text, args.model)
     except Exception as e:  # pragma: no cover
         print(json.dumps({"error": str(e)}))
         return
 
-    lines_ser = [dict(index=l.index, text=l.text, words=l.words, tokens=l.tokens) for l in data['lines']]
-    agg: Aggregate = data['aggregate']
     output: Dict[str, Any] = {
         "model": data['model'],
         "totals": {
-            "lines": len(lines_ser),
-            "words": agg.total_words,
-            "tokens": agg.total_tokens,
-            "avg_words_per_line": agg.avg_words_per_line,
-            "avg_tokens_per_line": agg.avg_tokens_per_line,
-            "tokens_per_word": agg.tokens_per_word,
+            "lines": data['lines_count'],
+            "words": data['total_words'],
+            "tokens": data['total_tokens'],
+            "avg_words_per_line": data['avg_words_per_line'],
+            "avg_tokens_per_line": data['avg_tokens_per_line'],
+            "tokens_per_word": data['tokens_per_word'],
         },
-        "lines": lines_ser,
     }
+    if not args.totals_only:
+        output['lines'] = data['lines']
     if args.capacity:
         if args.users_per_day and args.questions_per_user:
-            cap = capacity_calc(agg.avg_tokens_per_line, args.users_per_day, args.questions_per_user)
+            cap = capacity_calc(data['avg_tokens_per_line'], args.users_per_day, args.questions_per_user)
             output['capacity'] = cap
         else:
             output['capacity_error'] = 'users-per-day and questions-per-user required'
-    print(json.dumps(output, indent=2))
+    sys.stdout.write(json.dumps(output, indent=2) + "\n")
+    sys.stdout.flush()
 
 
 if __name__ == '__main__':